@@ -34,26 +34,36 @@ https://www.bigdomaindata.com/guide.php
 """
 
 import argparse
-import csv
-import datetime
+import atexit
+import functools
+import itertools
+import json
 import logging
+import math
 import os
 import sys
-import requests
+import time
 
-# ------------------------------------------------------------------------------
-# Preliminary parsing to capture the --debug flag.
-# This prevents --debug from being treated as an invalid query field.
-# ------------------------------------------------------------------------------
-prelim_parser = argparse.ArgumentParser(add_help=False)
-prelim_parser.add_argument("--debug", action="store_true", help="Show debug logging information.")
-prelim_args, remaining_args = prelim_parser.parse_known_args()
+# Heavier modules (requests, aiohttp, httpx, asyncio, csv, sqlite3) are imported
+# inside the functions that need them, so --help, --balance and argument errors
+# do not pay for imports they never use.
+
+# Use orjson for decoding API responses when it is installed; it is noticeably
+# faster than the standard library on large result sets.
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
+# ------------------------------------------------------------------------------
 # Set logging level based on the --debug flag.
-if prelim_args.debug:
-    LOG_LEVEL = logging.DEBUG
-else:
-    LOG_LEVEL = logging.INFO
+# Logging is configured before the argument parser runs, so check sys.argv
+# directly; the main parser still registers --debug for --help. argparse also
+# accepts abbreviations such as --deb, so match any prefix of --debug.
+# ------------------------------------------------------------------------------
+DEBUG_REQUESTED = any(a.startswith("--de") and "--debug".startswith(a) for a in sys.argv[1:])
+LOG_LEVEL = logging.DEBUG if DEBUG_REQUESTED else logging.INFO
 
 logging.basicConfig(
     level=LOG_LEVEL,  # Use DEBUG if --debug is passed, otherwise INFO.
@@ -61,6 +71,12 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+# httpx logs every request URL at INFO, and the URL contains the API key.
+# Only let those messages through when debugging.
+if LOG_LEVEL > logging.DEBUG:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("httpcore").setLevel(logging.WARNING)
+
 # ------------------------------------------------------------------------------
 # Attempt to import the settings module to load the API key.
 # ------------------------------------------------------------------------------
@@ -77,7 +93,7 @@ if not hasattr(settings, "API_KEY") or not settings.API_KEY:
 # ------------------------------------------------------------------------------
 # List of valid search fields.
 # ------------------------------------------------------------------------------
-VALID_SEARCH_FIELDS = [
+VALID_SEARCH_FIELDS = (
     "domain_keyword",
     "domain_name",
     "domain_tld",
@@ -130,8 +146,81 @@ VALID_SEARCH_FIELDS = [
     "registrant_fax_wildcard",
     "name_servers_wildcard",
     "domain_status_wildcard",
-    "dns_sec_wildcard"
-]
+    "dns_sec_wildcard",
+)
+
+# Characters that turn a search value into a (more expensive) wildcard search.
+WILDCARD_CHARS = frozenset("*?")
+
+# ------------------------------------------------------------------------------
+# API, concurrency, CSV and cache settings.
+# ------------------------------------------------------------------------------
+API_BASE_URL = "https://api.bigdomaindata.com/"
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) in seconds
+DEFAULT_BATCH_SIZE = 10  # maximum number of concurrent requests
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "whois_cache.sqlite3")
+DEFAULT_CACHE_TTL_HOURS = 24
+USER_AGENT = "reversewhois/1.0 (+https://github.com/nixintel/reversewhois)"
+RETRY_TOTAL = 3  # retries after the first attempt
+RETRY_BACKOFF_FACTOR = 0.3  # seconds; doubled on every further retry
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# ------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """
+    Return the shared requests session, creating it on first use.
+    Reusing one session keeps the TLS connection to the API alive between calls
+    and retries transient server errors with a short backoff.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=RETRY_TOTAL,
+                backoff_factor=RETRY_BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=("GET",),
+            ),
+        ),
+    )
+    session.headers["User-Agent"] = USER_AGENT
+    atexit.register(session.close)
+    return session
+
+# ------------------------------------------------------------------------------
+def retry_delay(retry_number, retry_after=None):
+    """
+    Return how many seconds to wait before the given retry (1-based) on the
+    asynchronous paths, matching the backoff of the requests session. A numeric
+    Retry-After header from the API takes precedence, capped at the read
+    timeout so one rate-limited request cannot stall a concurrent run.
+    """
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), REQUEST_TIMEOUT[1])
+    return RETRY_BACKOFF_FACTOR * (2 ** (retry_number - 1))
+
+# ------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def http2_available():
+    """
+    Return True if httpx and its HTTP/2 extra are installed. When they are,
+    concurrent queries are multiplexed over a single HTTP/2 connection instead
+    of one aiohttp connection each.
+    """
+    try:
+        import h2  # noqa: F401  (required by httpx for http2=True)
+        import httpx  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 # ------------------------------------------------------------------------------
 def query_api(database, api_key, search_params):
@@ -141,41 +230,358 @@ def query_api(database, api_key, search_params):
     Each search field is added as its own parameter. For example:
       /?key=XXXXX&database=current&domain_keyword_wildcard=yahoo*&domain_tld=com&create_year=2000
     """
-    base_url = "https://api.bigdomaindata.com/"
+    import requests
+
+    base_url = API_BASE_URL
     params = {
         "key": api_key,
         "database": database,
     }
     params.update(search_params)
     
-    logging.debug("Querying API with parameters: %s", {k: v for k, v in params.items() if k != "key"})
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Querying API with parameters: %s", {k: v for k, v in params.items() if k != "key"})
     try:
-        response = requests.get(base_url, params=params)
+        response = get_session().get(base_url, params=params, timeout=REQUEST_TIMEOUT)
         logging.debug("Received HTTP status code: %s", response.status_code)
         response.raise_for_status()
-        json_response = response.json()
+        json_response = json_loads(response.content)
         logging.debug("API response JSON: %s", json_response)
         return json_response
-    except requests.exceptions.RequestException as req_err:
+    except (requests.exceptions.RequestException, ValueError) as req_err:
         logging.error("Error during API request: %s", req_err, exc_info=True)
         raise
 
+# ------------------------------------------------------------------------------
+async def query_api_async(session, database, api_key, search_params):
+    """
+    Asynchronous counterpart of query_api, used when several queries are run
+    concurrently on a shared aiohttp session. Rate limiting, server errors and
+    connection failures are retried like on the requests session.
+    """
+    import asyncio
+    import aiohttp
+
+    params = {
+        "key": api_key,
+        "database": database,
+    }
+    params.update(search_params)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Querying API (async) with parameters: %s", {k: v for k, v in params.items() if k != "key"})
+    for attempt in range(RETRY_TOTAL + 1):
+        try:
+            async with session.get(API_BASE_URL, params=params) as response:
+                logging.debug("Received HTTP status code: %s", response.status)
+                if response.status in RETRY_STATUSES and attempt < RETRY_TOTAL:
+                    delay = retry_delay(attempt + 1, response.headers.get("Retry-After"))
+                    logging.warning("API returned HTTP %s, retrying in %.1f seconds.", response.status, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                response.raise_for_status()
+                json_response = json_loads(await response.read())
+                logging.debug("API response JSON: %s", json_response)
+                return json_response
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as conn_err:
+            if attempt < RETRY_TOTAL:
+                delay = retry_delay(attempt + 1)
+                logging.warning("Connection error (%s), retrying in %.1f seconds.", conn_err, delay)
+                await asyncio.sleep(delay)
+                continue
+            logging.error("Error during API request: %s", conn_err, exc_info=True)
+            raise
+        except (aiohttp.ClientError, ValueError) as req_err:
+            logging.error("Error during API request: %s", req_err, exc_info=True)
+            raise
+
+# ------------------------------------------------------------------------------
+async def query_api_http2(client, database, api_key, search_params):
+    """
+    Variant of query_api_async for an httpx.AsyncClient with HTTP/2 enabled,
+    with the same retries.
+    """
+    import asyncio
+    import httpx
+
+    params = {
+        "key": api_key,
+        "database": database,
+    }
+    params.update(search_params)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Querying API (HTTP/2) with parameters: %s", {k: v for k, v in params.items() if k != "key"})
+    for attempt in range(RETRY_TOTAL + 1):
+        try:
+            response = await client.get(API_BASE_URL, params=params)
+            logging.debug("Received HTTP status code: %s (%s)", response.status_code, response.http_version)
+            if response.status_code in RETRY_STATUSES and attempt < RETRY_TOTAL:
+                delay = retry_delay(attempt + 1, response.headers.get("Retry-After"))
+                logging.warning("API returned HTTP %s, retrying in %.1f seconds.", response.status_code, delay)
+                await asyncio.sleep(delay)
+                continue
+            response.raise_for_status()
+            json_response = json_loads(response.content)
+            logging.debug("API response JSON: %s", json_response)
+            return json_response
+        except httpx.TransportError as conn_err:
+            if attempt < RETRY_TOTAL:
+                delay = retry_delay(attempt + 1)
+                logging.warning("Connection error (%s), retrying in %.1f seconds.", conn_err, delay)
+                await asyncio.sleep(delay)
+                continue
+            logging.error("Error during API request: %s", conn_err, exc_info=True)
+            raise
+        except (httpx.HTTPError, ValueError) as req_err:
+            logging.error("Error during API request: %s", req_err, exc_info=True)
+            raise
+
+# ------------------------------------------------------------------------------
+async def _gather(api_key, queries, batch_size=DEFAULT_BATCH_SIZE, return_exceptions=False):
+    """
+    Run the given (database, search_params) queries concurrently and return the
+    responses in the same order. At most batch_size requests are in flight at
+    any time. Uses a single HTTP/2 connection via httpx when available, and a
+    pooled aiohttp session otherwise. With return_exceptions, a failed query
+    yields its exception in place of a response instead of aborting the rest.
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(batch_size)
+    headers = {"User-Agent": USER_AGENT}
+
+    async def run(query, session):
+        async def fetch(database, params):
+            async with semaphore:
+                return await query(session, database, api_key, params)
+
+        return await asyncio.gather(*[fetch(d, p) for d, p in queries], return_exceptions=return_exceptions)
+
+    if http2_available():
+        import httpx
+
+        timeout = httpx.Timeout(REQUEST_TIMEOUT[1], connect=REQUEST_TIMEOUT[0])
+        limits = httpx.Limits(max_connections=batch_size, max_keepalive_connections=batch_size)
+        async with httpx.AsyncClient(http2=True, timeout=timeout, limits=limits, headers=headers) as client:
+            return await run(query_api_http2, client)
+
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=batch_size, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        return await run(query_api_async, session)
+
+# ------------------------------------------------------------------------------
+def page_count(response):
+    """
+    Return the number of result pages for a reverse WHOIS response.
+    Pagination is only followed when the API reports its page size, so a
+    response without one is treated as a single page.
+    """
+    count_info = response.get("count") or {}
+    total = count_info.get("total", 0)
+    per_page = count_info.get("per_page") or response.get("per_page")
+    if not total or not per_page:
+        return 1
+    return math.ceil(total / per_page)
+
+# ------------------------------------------------------------------------------
+def open_cache(cache_path=CACHE_PATH, ttl_seconds=DEFAULT_CACHE_TTL_HOURS * 3600):
+    """
+    Open (and create if needed) the sqlite cache of reverse WHOIS responses.
+    Entries older than ttl_seconds are deleted so the file does not keep growing.
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(cache_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS q(k TEXT PRIMARY KEY, ts INTEGER, body BLOB)")
+    with conn:
+        expired = conn.execute("DELETE FROM q WHERE ts < ?", (time.time() - ttl_seconds,)).rowcount
+    logging.debug("Using response cache at: %s (%d expired entries removed)", cache_path, expired)
+    return conn
+
+# ------------------------------------------------------------------------------
+def cache_key(database, search_params):
+    """
+    Build the cache key for a query. The API key is deliberately not part of it.
+    """
+    import hashlib
+
+    return hashlib.sha1(repr((database, sorted(search_params.items()))).encode()).hexdigest()
+
+# ------------------------------------------------------------------------------
+def cache_get(conn, key, ttl_seconds):
+    """
+    Return the cached response for key, or None if it is missing or expired.
+    A cached response reports zero API credits used, since none were spent.
+    """
+    import gzip
+
+    row = conn.execute("SELECT ts, body FROM q WHERE k = ?", (key,)).fetchone()
+    if row is None or time.time() - row[0] > ttl_seconds:
+        return None
+    response = json_loads(gzip.decompress(row[1]))
+    if response.get("stats"):
+        response["stats"]["api_credits_used"] = 0
+    return response
+
+# ------------------------------------------------------------------------------
+def cache_put(conn, key, response):
+    """
+    Store a successful response in the cache.
+    """
+    import gzip
+
+    if not response.get("success"):
+        return
+    body = gzip.compress(json.dumps(response).encode("utf-8"))
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO q (k, ts, body) VALUES (?, ?, ?)", (key, int(time.time()), body))
+
+# ------------------------------------------------------------------------------
+def run_queries(api_key, queries, batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                cache_ttl=DEFAULT_CACHE_TTL_HOURS * 3600, return_exceptions=False):
+    """
+    Run the given (database, search_params) queries and return the responses in
+    the same order. Cached responses are used when a cache connection is given;
+    a single remaining query is sent synchronously, several are sent concurrently.
+    With return_exceptions, a failed query yields its exception in place of a
+    response instead of aborting the rest.
+    """
+    responses = [None] * len(queries)
+    keys = [cache_key(d, p) for d, p in queries] if cache is not None else None
+    if cache is not None:
+        for index, key in enumerate(keys):
+            responses[index] = cache_get(cache, key, cache_ttl)
+        hits = sum(response is not None for response in responses)
+        if hits:
+            logging.info("Using %d cached response(s).", hits)
+
+    missing = [index for index, response in enumerate(responses) if response is None]
+    if len(missing) == 1:
+        database, params = queries[missing[0]]
+        try:
+            fetched = [query_api(database, api_key, params)]
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            fetched = [e]
+    elif missing:
+        import asyncio
+
+        logging.info("Running %d queries concurrently.", len(missing))
+        fetched = asyncio.run(_gather(api_key, [queries[i] for i in missing], batch_size, return_exceptions))
+    else:
+        fetched = []
+
+    for index, response in zip(missing, fetched):
+        responses[index] = response
+        if cache is not None and not isinstance(response, Exception):
+            cache_put(cache, keys[index], response)
+    return responses
+
+# ------------------------------------------------------------------------------
+def fetch_remaining_pages(api_key, queries, responses, batch_size=DEFAULT_BATCH_SIZE,
+                          cache=None, cache_ttl=DEFAULT_CACHE_TTL_HOURS * 3600, return_exceptions=False):
+    """
+    Fetch pages 2..N of every response concurrently and append their results
+    to the first-page response they belong to. With return_exceptions, a query
+    whose page fetch fails has its response replaced by the exception.
+    """
+    page_requests = [
+        (index, (database, {**params, "page": page}))
+        for index, ((database, params), response) in enumerate(zip(queries, responses))
+        if not isinstance(response, Exception)
+        for page in range(2, page_count(response) + 1)
+    ]
+    if not page_requests:
+        return responses
+
+    logging.info("Fetching %d additional result page(s), %d at a time.", len(page_requests), batch_size)
+    page_responses = run_queries(api_key, [q for _, q in page_requests], batch_size, cache, cache_ttl,
+                                 return_exceptions)
+    for (index, _), page_response in zip(page_requests, page_responses):
+        if isinstance(responses[index], Exception):
+            continue
+        if isinstance(page_response, Exception):
+            responses[index] = page_response
+            continue
+        results = responses[index].setdefault("results", [])
+        results.extend(page_response.get("results") or [])
+        # Every page is charged separately, so its credits count towards the
+        # query; if any page does not report them the total becomes unknown.
+        stats_info = responses[index].get("stats")
+        page_stats = page_response.get("stats")
+        if stats_info and "api_credits_used" in stats_info:
+            if page_stats and "api_credits_used" in page_stats:
+                stats_info["api_credits_used"] += page_stats["api_credits_used"]
+            else:
+                del stats_info["api_credits_used"]
+    return responses
+
+# ------------------------------------------------------------------------------
+def merge_responses(responses):
+    """
+    Combine several reverse WHOIS responses into one with the same shape as a
+    single API response, so the summary and CSV output code can stay unchanged.
+    Overlapping queries can return the same record more than once; identical
+    records are kept only once and are not counted again in the total.
+    """
+    results = []
+    seen = set()
+    duplicates = 0
+    total = 0
+    credits_used = 0
+    for response in responses:
+        for result in response.get("results") or []:
+            # Compare whole records: in the historical database one domain can
+            # legitimately have several different records.
+            record_key = json.dumps(result, sort_keys=True, default=str)
+            if record_key in seen:
+                duplicates += 1
+                continue
+            seen.add(record_key)
+            results.append(result)
+        count_info = response.get("count")
+        total += count_info.get("total", 0) if count_info else 0
+        stats_info = response.get("stats")
+        if credits_used is not None and stats_info and "api_credits_used" in stats_info:
+            credits_used += stats_info["api_credits_used"]
+        else:
+            credits_used = None
+
+    if duplicates:
+        logging.info("Removed %d duplicate record(s) returned by more than one query.", duplicates)
+
+    merged = {
+        "success": all(response.get("success") for response in responses),
+        "count": {"total": total - duplicates},
+        "results": results,
+    }
+    if credits_used is not None:
+        merged["stats"] = {"api_credits_used": credits_used}
+    return merged
+
 # ------------------------------------------------------------------------------
 def check_api_balance(api_key):
     """
     Check the API balance.
     """
-    base_url = "https://api.bigdomaindata.com/"
+    import requests
+
+    base_url = API_BASE_URL
     params = {"key": api_key}
     logging.debug("Checking API balance.")
     try:
-        response = requests.get(base_url, params=params)
+        response = get_session().get(base_url, params=params, timeout=REQUEST_TIMEOUT)
         logging.debug("Balance query HTTP status code: %s", response.status_code)
         response.raise_for_status()
-        balance_data = response.json()
+        balance_data = json_loads(response.content)
         logging.debug("Balance API response JSON: %s", balance_data)
         return balance_data
-    except requests.exceptions.RequestException as req_err:
+    except (requests.exceptions.RequestException, ValueError) as req_err:
         logging.error("Error during balance check: %s", req_err, exc_info=True)
         raise
 
@@ -191,7 +597,9 @@ def query_bulk_whois_api(api_key, domains):
     Returns:
         JSON response from the API.
     """
-    base_url = "https://api.bigdomaindata.com/"
+    import requests
+
+    base_url = API_BASE_URL
     # Join domains with comma for the bulk_whois parameter
     domains_str = ",".join(domains)
     params = {
@@ -201,13 +609,13 @@ def query_bulk_whois_api(api_key, domains):
     
     logging.debug("Querying bulk WHOIS API with %d domains", len(domains))
     try:
-        response = requests.get(base_url, params=params)
+        response = get_session().get(base_url, params=params, timeout=REQUEST_TIMEOUT)
         logging.debug("Received HTTP status code: %s", response.status_code)
         response.raise_for_status()
-        json_response = response.json()
+        json_response = json_loads(response.content)
         logging.debug("API response JSON: %s", json_response)
         return json_response
-    except requests.exceptions.RequestException as req_err:
+    except (requests.exceptions.RequestException, ValueError) as req_err:
         logging.error("Error during bulk WHOIS API request: %s", req_err, exc_info=True)
         raise
 
@@ -256,7 +664,75 @@ def parse_domain_input(domains_arg, domains_file_arg):
     return domains
 
 # ------------------------------------------------------------------------------
-def write_csv(results_data, output_filename=None, prefix="reverse_whois"):
+def load_batch_file(batch_file_arg):
+    """
+    Load reverse WHOIS queries from a JSON batch file.
+
+    The file must contain a list of objects such as:
+      {"endpoint": "current", "params": {"domain_keyword": "yahoo"}, "output": "yahoo"}
+    where "output" is optional and "params" uses the same search fields as the
+    command line.
+
+    Args:
+        batch_file_arg: Path to the JSON file from the --batch-file argument.
+
+    Returns:
+        List of query dictionaries with "endpoint", "params" and "output" keys.
+
+    Raises:
+        ValueError: If the file cannot be read or a query is invalid.
+    """
+    try:
+        with open(batch_file_arg, "rb") as f:
+            entries = json_loads(f.read())
+    except FileNotFoundError:
+        raise ValueError(f"Batch file not found: {batch_file_arg}")
+    except Exception as e:
+        raise ValueError(f"Error reading batch file: {e}")
+
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Batch file must contain a non-empty JSON list of queries.")
+
+    queries = []
+    outputs = set()
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Batch query {number} must be a JSON object.")
+        endpoint = entry.get("endpoint")
+        if endpoint not in ("current", "historical"):
+            raise ValueError(f"Batch query {number}: endpoint must be 'current' or 'historical'.")
+        params = entry.get("params")
+        if not isinstance(params, dict) or not params:
+            raise ValueError(f"Batch query {number}: 'params' must be a non-empty object of search fields.")
+        invalid = [field for field in params if field not in VALID_SEARCH_FIELDS]
+        if invalid:
+            raise ValueError(f"Batch query {number}: invalid search field(s): {', '.join(invalid)}")
+        # bool is a subclass of int but is not a meaningful search value.
+        non_scalar = [field for field, value in params.items()
+                      if not isinstance(value, (str, int, float)) or isinstance(value, bool)]
+        if non_scalar:
+            raise ValueError(f"Batch query {number}: search field(s) must be strings or numbers: "
+                             f"{', '.join(non_scalar)}")
+        output = entry.get("output")
+        if output is not None:
+            if not isinstance(output, str) or not output.strip():
+                raise ValueError(f"Batch query {number}: 'output' must be a non-empty string.")
+            # write_csv appends .csv when missing, so compare the final filenames.
+            filename = output if output.lower().endswith(".csv") else output + ".csv"
+            if filename.lower() in outputs:
+                raise ValueError(f"Batch query {number}: output '{output}' is used by another query.")
+            outputs.add(filename.lower())
+        queries.append({
+            "endpoint": endpoint,
+            "params": {field: str(value) for field, value in params.items()},
+            "output": output,
+        })
+
+    logging.debug("Read %d queries from batch file: %s", len(queries), batch_file_arg)
+    return queries
+
+# ------------------------------------------------------------------------------
+def write_csv(results_data, output_filename=None, prefix="reverse_whois", tee=False):
     """
     Write the query results (from the "results" field) to a CSV file.
     The file is saved in a subfolder called "results" with the filename either:
@@ -267,7 +743,16 @@ def write_csv(results_data, output_filename=None, prefix="reverse_whois"):
         results_data: List of result dictionaries to write to CSV.
         output_filename: Optional custom filename from user.
         prefix: Prefix for auto-generated filename (default: "reverse_whois").
+        tee: If True, also return the CSV text so it can be displayed without
+            reading the file back from disk.
+
+    Returns:
+        The path of the CSV file, or a (filepath, csv_text) tuple if tee is True.
+        csv_text uses "\n" line endings, like the file read back in text mode.
     """
+    import csv
+    import io
+
     results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
     os.makedirs(results_dir, exist_ok=True)
 
@@ -276,37 +761,57 @@ def write_csv(results_data, output_filename=None, prefix="reverse_whois"):
         if not filename.lower().endswith(".csv"):
             filename += ".csv"
     else:
-        now = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        now = time.strftime("%Y-%m-%d_%H-%M-%S")
         filename = f"{prefix}_{now}.csv"
 
     filepath = os.path.join(results_dir, filename)
     logging.info("Saving CSV to: %s", filepath)
 
-    all_keys = set()
-    for result in results_data:
-        all_keys.update(result.keys())
-    all_keys = sorted(list(all_keys))
-
-    processed_results = []
+    # One pass to collect the columns (in first-seen order, as the API returns
+    # them) and the columns that hold a list in any row. Only those columns
+    # need the list check when the rows are written.
+    all_keys = {}
+    list_keys = set()
     for result in results_data:
-        processed_row = {}
-        for key in all_keys:
-            value = result.get(key, "")
-            if isinstance(value, list):
-                value = ";".join(str(item) for item in value)
-            processed_row[key] = value
-        processed_results.append(processed_row)
+        all_keys.update(dict.fromkeys(result))
+        list_keys.update(k for k, v in result.items() if type(v) is list)
+    columns = [(key, key in list_keys) for key in all_keys]
+    all_keys = list(all_keys)
 
     try:
-        with open(filepath, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=all_keys)
-            writer.writeheader()
-            writer.writerows(processed_results)
+        # With tee the rows go to an in-memory buffer first, which is then
+        # written to disk and handed back to the caller.
+        if tee:
+            csvfile = io.StringIO(newline="")
+        else:
+            csvfile = open(filepath, "w", newline="", encoding="utf-8")
+        with csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(all_keys)
+            # Rows are built and written one at a time rather than collected first.
+            writerow = writer.writerow
+            for result in results_data:
+                row = []
+                for key, is_list_column in columns:
+                    value = result.get(key, "")
+                    # Decoded JSON only contains plain lists, so an exact type
+                    # check is enough and cheaper than isinstance.
+                    if is_list_column and type(value) is list:
+                        value = ";".join(str(item) for item in value)
+                    row.append(value)
+                writerow(row)
+            if tee:
+                csv_data = csvfile.getvalue()
+                with open(filepath, "w", newline="", encoding="utf-8") as f:
+                    f.write(csv_data)
         logging.info("CSV file saved successfully.")
     except Exception as e:
         logging.error("Error writing CSV file: %s", e, exc_info=True)
         raise
 
+    if tee:
+        # csv.writer ends rows with "\r\n"; convert them for terminal display.
+        return filepath, csv_data.replace("\r\n", "\n")
     return filepath
 
 # ------------------------------------------------------------------------------
@@ -317,24 +822,23 @@ def main():
     """
     logging.info("Starting Reverse Whois Query Script.")
 
-    results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
-        logging.debug("Created results folder at: %s", results_dir)
-    
+    # The list of search fields is only needed in the --help output. argparse
+    # also accepts abbreviations such as --hel, so match any prefix of --help.
+    help_requested = any(a == "-h" or (a.startswith("--h") and "--help".startswith(a)) for a in sys.argv[1:])
+    fields_help = ", ".join(VALID_SEARCH_FIELDS) if help_requested else ""
+
     # Set up the main argument parser.
     parser = argparse.ArgumentParser(
         description=(
             "WHOIS Query Tool for the Big Domain Data API.\n"
             "This independent tool allows you to query either the 'current' or 'historical' database "
             "for reverse WHOIS searches, or use the 'bulk' endpoint to query multiple domains.\n"
-            "Valid search fields include:\n  " + ", ".join(VALID_SEARCH_FIELDS)
+            "Valid search fields include:\n  " + fields_help
         ),
         epilog="For more information on the API, please refer to: https://www.bigdomaindata.com/guide.php"
     )
-    # Add --debug so that it appears in help; its value defaults from prelim_args.
-    parser.add_argument("--debug", action="store_true", default=prelim_args.debug,
-                        help="Show debug logging information.")
+    # Add --debug so that it appears in help; logging was already configured from sys.argv.
+    parser.add_argument("--debug", action="store_true", help="Show debug logging information.")
     parser.add_argument(
         "endpoint",
         choices=["current", "historical", "bulk"],
@@ -352,13 +856,23 @@ def main():
         dest="domains_file",
         help="Path to file containing domains (one per line) for bulk WHOIS query."
     )
+    # Per-field help strings are only built when --help will actually print them.
+    search_fields = parser.add_argument_group("search fields")
     for field in VALID_SEARCH_FIELDS:
-        parser.add_argument(
+        search_fields.add_argument(
             f"--{field}",
             dest=field,
             type=str,
-            help=f"Search query for '{field}'."
+            action="append",
+            help=(f"Search query for '{field}'. Repeat to run one query per value concurrently (each query uses API credits)."
+                  if help_requested else argparse.SUPPRESS)
         )
+    parser.add_argument(
+        "--batch-file",
+        type=str,
+        dest="batch_file",
+        help="Path to a JSON file with a list of reverse WHOIS queries to run concurrently in one go."
+    )
     parser.add_argument(
         "--output",
         type=str,
@@ -369,17 +883,40 @@ def main():
         action="store_true",
         help="Display the CSV output on the terminal."
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        dest="batch_size",
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Maximum number of concurrent API requests when fetching several queries or result pages (default: {DEFAULT_BATCH_SIZE})."
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Reuse responses to identical reverse WHOIS queries from a local cache instead of spending API credits again."
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        dest="cache_ttl",
+        default=DEFAULT_CACHE_TTL_HOURS,
+        help=f"Maximum age in hours of cached responses used with --cache (default: {DEFAULT_CACHE_TTL_HOURS})."
+    )
     parser.add_argument(
         "--balance",
         action="store_true",
         help="Check API balance and print it to the terminal. If used, no reverse WHOIS query is performed."
     )
 
-    # Parse arguments using the remaining_args from the preliminary parser.
-    args = parser.parse_args(remaining_args)
+    args = parser.parse_args(sys.argv[1:])
 
     logging.debug("Parsed arguments: %s", args)
 
+    if args.batch_size < 1:
+        print("Error: --batch-size must be at least 1.")
+        sys.exit(1)
+
     # If --balance is specified, perform only the API balance check and exit.
     if args.balance:
         try:
@@ -397,8 +934,71 @@ def main():
             sys.exit(1)
         sys.exit(0)
 
+    # Handle a batch file of reverse WHOIS queries. Each query is written to its
+    # own CSV file and the exit status is 1 if any of them failed.
+    if args.batch_file:
+        if args.endpoint:
+            print("Error: --batch-file cannot be combined with an endpoint; set the endpoint per query in the file.")
+            sys.exit(1)
+        args_dict = vars(args)
+        if any(args_dict[field] is not None for field in VALID_SEARCH_FIELDS):
+            print("Error: --batch-file cannot be combined with search fields; set them per query in the file.")
+            sys.exit(1)
+        if args.output or args.show or args.domains or args.domains_file:
+            print("Error: --batch-file cannot be combined with --output, --show, --domains or --domains-file; "
+                  "set the output filename per query in the file.")
+            sys.exit(1)
+        try:
+            batch = load_batch_file(args.batch_file)
+        except ValueError as ve:
+            print(f"Error: {ve}")
+            sys.exit(1)
+
+        print(f"Running {len(batch)} queries from batch file...")
+        queries = [(entry["endpoint"], entry["params"]) for entry in batch]
+        cache_ttl = args.cache_ttl * 3600
+        cache = open_cache(ttl_seconds=cache_ttl) if args.cache else None
+        try:
+            responses = run_queries(settings.API_KEY, queries, args.batch_size, cache, cache_ttl,
+                                    return_exceptions=True)
+            fetch_remaining_pages(settings.API_KEY, queries, responses, args.batch_size, cache,
+                                  cache_ttl, return_exceptions=True)
+        finally:
+            if cache is not None:
+                cache.close()
+
+        failed = 0
+        for number, (entry, response) in enumerate(zip(batch, responses), start=1):
+            label = f"[{number}] {entry['endpoint']} {entry['params']}"
+            if isinstance(response, Exception):
+                print(f"{label}: Error: {response}")
+                failed += 1
+                continue
+            if not response.get("success"):
+                print(f"{label}: Error: {response.get('error', 'Unknown error')}")
+                failed += 1
+                continue
+            count_info = response.get("count")
+            total_matches = count_info.get("total", 0) if count_info else 0
+            results_data = response.get("results", [])
+            if not results_data or total_matches == 0:
+                print(f"{label}: No matches found.")
+                continue
+            try:
+                csv_filepath = write_csv(results_data, output_filename=entry["output"],
+                                         prefix=f"reverse_whois_batch{number}")
+            except Exception:
+                logging.exception("Failed to write CSV output for batch query %d.", number)
+                failed += 1
+                continue
+            print(f"{label}: {total_matches} matches saved to {csv_filepath}")
+
+        print(f"Batch completed: {len(batch) - failed} succeeded, {failed} failed.")
+        logging.info("Batch execution completed.")
+        sys.exit(1 if failed else 0)
+
     if not args.endpoint:
-        print("Error: You must specify an endpoint ('current', 'historical', or 'bulk') unless using --balance.")
+        print("Error: You must specify an endpoint ('current', 'historical', or 'bulk') unless using --balance or --batch-file.")
         sys.exit(1)
 
     # Handle bulk WHOIS queries
@@ -451,12 +1051,15 @@ def main():
                 print("No results found.")
             else:
                 try:
-                    csv_filepath = write_csv(results_data, output_filename=args.output, prefix="bulk_whois")
+                    if args.show:
+                        csv_filepath, csv_data = write_csv(results_data, output_filename=args.output,
+                                                           prefix="bulk_whois", tee=True)
+                    else:
+                        csv_filepath = write_csv(results_data, output_filename=args.output, prefix="bulk_whois")
                     print(f"Results saved to CSV file: {csv_filepath}")
                     if args.show:
                         print("\nCSV File Content:")
-                        with open(csv_filepath, "r", encoding="utf-8") as f:
-                            print(f.read())
+                        print(csv_data)
                 except Exception:
                     logging.exception("Failed to write CSV output.")
                     sys.exit(1)
@@ -469,26 +1072,39 @@ def main():
         sys.exit(0)
 
     # Handle reverse WHOIS queries (current/historical)
-    # Build search parameters dictionary.
-    search_params = {}
-    for field in VALID_SEARCH_FIELDS:
-        value = getattr(args, field)
-        if value is not None:
-            if "*" in value or "?" in value:
+    # Build search parameters dictionary. Each field may be given several times;
+    # every combination of distinct values becomes its own query.
+    args_dict = vars(args)
+    search_params = {field: list(dict.fromkeys(args_dict[field]))
+                     for field in VALID_SEARCH_FIELDS if args_dict[field] is not None}
+    for field, values in search_params.items():
+        for value in values:
+            if not WILDCARD_CHARS.isdisjoint(value):
                 logging.warning("Wildcard detected in '%s' with value '%s'. Using wildcards may cost additional API credits.", field, value)
-            search_params[field] = value
 
     if not search_params:
         print("Error: No search fields provided. Please supply at least one search field argument (e.g., --domain_keyword yahoo).")
         sys.exit(1)
 
-    logging.debug("Constructed search parameters: %s", search_params)
+    param_sets = [dict(zip(search_params, combo)) for combo in itertools.product(*search_params.values())]
+    logging.debug("Constructed search parameters: %s", param_sets)
+    if len(param_sets) > 1:
+        print(f"Repeated search fields expand to {len(param_sets)} separate queries; "
+              "each query uses its own API credits.")
 
+    cache_ttl = args.cache_ttl * 3600
+    cache = open_cache(ttl_seconds=cache_ttl) if args.cache else None
     try:
-        response = query_api(args.endpoint, settings.API_KEY, search_params)
+        queries = [(args.endpoint, params) for params in param_sets]
+        responses = run_queries(settings.API_KEY, queries, args.batch_size, cache, cache_ttl)
+        fetch_remaining_pages(settings.API_KEY, queries, responses, args.batch_size, cache, cache_ttl)
+        response = responses[0] if len(responses) == 1 else merge_responses(responses)
     except Exception:
         logging.exception("Reverse WHOIS query failed.")
         sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
 
     # Print a summary of the query response.
     success_status = response.get("success")
@@ -508,12 +1124,14 @@ def main():
         print("No matches found for the query.")
     else:
         try:
-            csv_filepath = write_csv(results_data, output_filename=args.output)
+            if args.show:
+                csv_filepath, csv_data = write_csv(results_data, output_filename=args.output, tee=True)
+            else:
+                csv_filepath = write_csv(results_data, output_filename=args.output)
             print(f"Results saved to CSV file: {csv_filepath}")
             if args.show:
                 print("\nCSV File Content:")
-                with open(csv_filepath, "r", encoding="utf-8") as f:
-                    print(f.read())
+                print(csv_data)
         except Exception:
             logging.exception("Failed to write CSV output.")
             sys.exit(1)